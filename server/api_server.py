@@ -1,6 +1,9 @@
 from flask import Flask, request, jsonify
 import os
 import json
+import tempfile
+import uuid
+import threading
 import sqlite3
 import pymongo
 import pyodbc
@@ -16,6 +19,8 @@ logging.basicConfig(filename='api-server.log', level=logging.INFO, format='%(asc
 logger = logging.getLogger()
 
 schema_info = None
+# Serializes the db-config.txt hand-off so each upload retires exactly one file
+config_lock = threading.Lock()
 
 # Database factory (simplified)
 def create_database(config):
@@ -42,6 +47,24 @@ def generate_schema_info(db):
         return '\n'.join(str(row) for row in cursor.tables())
     return "Schema not implemented"
 
+def write_atomically(path, text):
+    # The MCP server re-reads these files on every request
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.')
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def current_uploads():
+    """Returns the (path, previousPath) SQLite uploads of the loaded config."""
+    try:
+        with open('db-config.txt', 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    if config.get('type') != 'sqlite':
+        return None, None
+    return config.get('path'), config.get('previousPath')
+
 @app.route('/api/load-db', methods=['POST'])
 def load_db():
     global schema_info
@@ -57,7 +80,10 @@ def load_db():
             logger.info(f"Received file: {file.filename if file else 'None'}")
             if not file:
                 return jsonify({'success': False, 'error': 'No file uploaded for SQLite'}), 400
-            db_path = os.path.join('uploads', 'current.db')
+            # Every upload gets its own file, so connections the MCP server
+            # still holds on the previous upload never share its journal path
+            # and never see it truncated underneath their memory maps
+            db_path = os.path.join('uploads', f'{uuid.uuid4().hex}.db')
             file.save(db_path)
             config['path'] = db_path
             config['name'] = file.filename
@@ -76,10 +102,22 @@ def load_db():
         
         db = create_database(config)
         schema_info = generate_schema_info(db)
-        with open('schema.txt', 'w') as f:
-            f.write(schema_info)
-        with open('db-config.txt', 'w') as f:
-            json.dump(config, f)
+        with config_lock:
+            previous_path, retired_path = current_uploads()
+            retired = [retired_path]
+            if db_type == 'sqlite' and previous_path:
+                # Requests already running against the previous upload may still
+                # open it, so it is kept until the next upload replaces this one
+                config['previousPath'] = previous_path
+            else:
+                retired.append(previous_path)
+            write_atomically('schema.txt', schema_info)
+            write_atomically('db-config.txt', json.dumps(config))
+        for path in filter(None, retired):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.info(f"Could not remove retired upload {path}: {e}")
         
         return jsonify({'success': True})
     except Exception as e:
@@ -10,12 +10,18 @@ import threading
 import atexit
 import subprocess
 import logging
+import concurrent.futures
+from dotenv import load_dotenv
 
 BASE_DIR   = os.path.dirname(__file__)  
 STATIC_DIR = os.path.abspath(os.path.join(BASE_DIR, '..', 'static'))
 MCP_SERVER_PATH = os.path.join(BASE_DIR, 'mcp_server.py')
 
 app = Flask(__name__,static_folder=STATIC_DIR,static_url_path='')
+load_dotenv()
+
+# How long a Flask request waits on the MCP server before giving up on a call
+MCP_CALL_TIMEOUT = float(os.getenv('MCP_CALL_TIMEOUT', 120))
 
 logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger()
@@ -28,13 +34,27 @@ transport = StdioClientTransport(command='python', args=[MCP_SERVER_PATH])
 client = Client(name='web-client', version='1.0.0')
 is_client_connected = False
 
+# The MCP client runs on its own loop thread so concurrent Flask requests can
+# share it; each request blocks only on the future for its own tool call
 loop = asyncio.new_event_loop()
-asyncio.set_event_loop(loop)
+threading.Thread(target=loop.run_forever, daemon=True).start()
+
+def run_async(coro, timeout=None):
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        # Cancelling the call makes the client ask the MCP server to stop it
+        future.cancel()
+        raise TimeoutError(f'MCP call timed out after {timeout}s')
+    except BaseException:
+        future.cancel()
+        raise
 
 def connect_mcp_client():
     global is_client_connected
     try:
-        loop.run_until_complete(client.connect(transport))
+        run_async(client.connect(transport))
         is_client_connected = True
         logger.info('Connected to MCP server')
     except Exception as e:
@@ -53,7 +73,7 @@ def query():
     try:
         start_time = time.time()
         logger.info(f'Sending request to MCP server: {json.dumps({"type": "call_tool", "name": "query_database", "arguments": {"query": query, "aiProvider": ai_provider, "includeQuery": include_query, "includeExplanation": include_explanation, "includeResults": include_results}})}')
-        result = loop.run_until_complete(client.call_tool(
+        result = run_async(client.call_tool(
             name='query_database',
             arguments={
                 'query': query,
@@ -62,7 +82,7 @@ def query():
                 'includeExplanation': include_explanation,
                 'includeResults': include_results
             }
-        ))
+        ), timeout=MCP_CALL_TIMEOUT)
         logger.info(f'Received response from MCP server: {result}')
         duration = (time.time() - start_time) * 1000
         logger.info(f'Query "{query}" processed in {duration:.2f}ms')
@@ -0,0 +1,462 @@
+"""Load and concurrency-regression harness for the HTTP front end.
+
+Runs app.py and api_server.py in-process against a generated SQLite database,
+with the MCP server started as a subprocess that uses a stub AI provider, and
+drives /api/query and /api/load-db with closed-loop (fixed concurrency) or
+open-loop (Poisson arrivals) traffic.
+
+Examples:
+    python server/load_test.py --concurrency 1,2,4,8 --duration 10
+    python server/load_test.py --rate 5,10,20 --modify-ratio 0.1 --save-baseline baseline.json
+    python server/load_test.py --concurrency 4 --baseline baseline.json --tolerance 0.15
+"""
+import argparse
+import asyncio
+import collections
+import contextvars
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Search questions and the SQL the stub provider answers them with. Earlier
+# entries are picked more often so the workload has a hot head.
+SEARCH_QUERIES = {
+    'how many farms are there': 'SELECT COUNT(*) AS farms FROM farms;',
+    'total yield per region': 'SELECT f.region, SUM(c.yield_kg) AS total FROM crops c JOIN farms f ON f.id = c.farm_id GROUP BY f.region;',
+    'top 10 farms by yield': 'SELECT f.name, SUM(c.yield_kg) AS total FROM crops c JOIN farms f ON f.id = c.farm_id GROUP BY f.id ORDER BY total DESC LIMIT 10;',
+    'average yield per crop': 'SELECT name, AVG(yield_kg) AS avg_yield FROM crops GROUP BY name;',
+    'crops planted in 2024': "SELECT * FROM crops WHERE planted_on LIKE '2024%' LIMIT 50;",
+}
+CROP_NAMES = ['wheat', 'corn', 'barley', 'soy', 'rice', 'oats']
+REGIONS = ['north', 'south', 'east', 'west']
+
+
+class StubAIProvider:
+    """Deterministic stand-in for AIProvider used by the MCP subprocess."""
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_query(self, schema_info, mode, user_query, db_type):
+        await asyncio.sleep(self.latency)
+        if mode == 'modify':
+            match = re.match(r'add crop (\w+) to farm (\d+)', user_query)
+            name, farm_id = match.groups() if match else ('wheat', '1')
+            return f"INSERT INTO crops (farm_id, name, yield_kg, planted_on) VALUES ({farm_id}, '{name}', 10, '2025-01-01')"
+        match = re.match(r'crops on farm (\d+)', user_query)
+        if match:
+            return f'SELECT * FROM crops WHERE farm_id = {match.group(1)};'
+        return SEARCH_QUERIES.get(user_query, 'SELECT 1 AS ok;')
+
+    async def generate_explanation(self, user_query, results):
+        await asyncio.sleep(self.latency)
+        return f'{len(results)} rows returned.'
+
+
+def run_stub_mcp_server(latency: float):
+    import mcp_server
+    mcp_server.create_ai_provider = lambda ai_provider_str: StubAIProvider(latency)
+    asyncio.run(mcp_server.main())
+
+
+def create_seed_database(path: str, farms: int, crops_per_farm: int):
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE farms (id INTEGER PRIMARY KEY, name TEXT, region TEXT)')
+    conn.execute('CREATE TABLE crops (id INTEGER PRIMARY KEY, farm_id INTEGER, name TEXT, yield_kg REAL, planted_on TEXT)')
+    conn.executemany('INSERT INTO farms (id, name, region) VALUES (?, ?, ?)',
+                     [(i, f'Farm {i}', rng.choice(REGIONS)) for i in range(1, farms + 1)])
+    conn.executemany('INSERT INTO crops (farm_id, name, yield_kg, planted_on) VALUES (?, ?, ?, ?)',
+                     [(farm_id, rng.choice(CROP_NAMES), round(rng.uniform(1, 100), 2),
+                       f'{rng.choice([2023, 2024, 2025])}-{rng.randint(1, 12):02d}-01')
+                      for farm_id in range(1, farms + 1) for _ in range(crops_per_farm)])
+    conn.commit()
+    conn.close()
+
+
+# Timing record for the tool call running in the current task
+call_timing = contextvars.ContextVar('call_timing')
+
+
+class PipeTracker:
+    """Measures how long tool calls wait to reach the stdio pipe and how long they spend on it.
+
+    Client.call_tool is wrapped on the Flask request thread, so the wait covers
+    everything between the HTTP handler calling the client and the message
+    being written to the MCP server's stdin.
+    """
+    def __init__(self, client, transport, stall_threshold):
+        self.client_call_tool = client.call_tool
+        self.transport = transport
+        self.stall_threshold = stall_threshold
+        self.lock = threading.Lock()
+        client.call_tool = self.call_tool
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.waits = []
+            self.round_trips = []
+
+    def call_tool(self, name, arguments):
+        return self.timed_call(time.perf_counter(), name, arguments)
+
+    async def timed_call(self, entered, name, arguments):
+        timing = {}
+        call_timing.set(timing)
+        try:
+            return await self.client_call_tool(name, arguments)
+        finally:
+            finished = time.perf_counter()
+            with self.lock:
+                self.waits.append(timing.get('sent', finished) - entered)
+                if 'sent' in timing:
+                    self.in_flight -= 1
+                    self.round_trips.append(finished - timing['sent'])
+
+    async def connect(self):
+        await self.transport.connect()
+
+    async def send(self, message):
+        timing = call_timing.get(None)
+        if timing is not None:
+            timing['sent'] = time.perf_counter()
+            with self.lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await self.transport.send(message)
+
+    async def receive(self):
+        return await self.transport.receive()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'calls': len(self.waits),
+                'stalls': sum(1 for wait in self.waits if wait > self.stall_threshold),
+                'max_in_flight': self.max_in_flight,
+                'wait': latency_summary(self.waits),
+                'round_trip': latency_summary(self.round_trips),
+            }
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.rng_lock = threading.Lock()
+        self.local = threading.local()
+        self.original_cwd = os.getcwd()
+        self.workdir = tempfile.mkdtemp(prefix='mcp-load-')
+        self.seed_path = os.path.join(self.workdir, 'seed.db')
+
+    def start(self):
+        # app.py, api_server.py and the MCP subprocess all read and write
+        # schema.txt, db-config.txt and uploads/ relative to the working dir
+        os.chdir(self.workdir)
+        os.makedirs('uploads', exist_ok=True)
+        create_seed_database(self.seed_path, self.args.farms, self.args.crops_per_farm)
+        sys.path.insert(0, BASE_DIR)
+        if self.args.no_materialize:
+            os.environ['MATERIALIZE_MIN_HITS'] = str(sys.maxsize)
+
+        import requests
+        from werkzeug.serving import make_server
+        from mcp_sdk import StdioClientTransport
+        import app
+        import api_server
+
+        self.requests = requests
+        self.api_server_http = make_server('127.0.0.1', 0, api_server.app, threaded=True)
+        threading.Thread(target=self.api_server_http.serve_forever, daemon=True).start()
+        self.api_url = f'http://127.0.0.1:{self.api_server_http.server_port}'
+        self.load_db()
+
+        stub_transport = StdioClientTransport(
+            command=sys.executable,
+            args=[os.path.abspath(__file__), '--mcp-stub', '--llm-latency', str(self.args.llm_latency)]
+        )
+        self.pipe = PipeTracker(app.client, stub_transport, self.args.stall_ms / 1000)
+        app.transport = self.pipe
+        app.connect_mcp_client()
+        if not app.is_client_connected:
+            raise RuntimeError('Failed to connect to the stub MCP server')
+        self.app_module = app
+        self.app_http = make_server('127.0.0.1', 0, app.app, threaded=True)
+        threading.Thread(target=self.app_http.serve_forever, daemon=True).start()
+        self.app_url = f'http://127.0.0.1:{self.app_http.server_port}'
+
+    def stop(self):
+        # Safe to call after a partial start()
+        for server in (getattr(self, 'app_http', None), getattr(self, 'api_server_http', None)):
+            if server:
+                server.shutdown()
+        process = self.pipe.transport.process if hasattr(self, 'pipe') else None
+        if process and process.returncode is None:
+            process.terminate()
+        os.chdir(self.original_cwd)
+        if self.args.keep_workdir:
+            print(f'Logs and databases kept in {self.workdir}', file=sys.stderr)
+        else:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = self.requests.Session()
+        return self.local.session
+
+    def load_db(self):
+        with open(self.seed_path, 'rb') as f:
+            response = self.session().post(f'{self.api_url}/api/load-db', data={'type': 'sqlite'},
+                                           files={'dbFile': ('farm.db', f)}, timeout=self.args.timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f'/api/load-db returned {response.status_code}: {response.text}')
+        return response
+
+    def pick_request(self):
+        with self.rng_lock:
+            roll = self.rng.random()
+            if roll < self.args.load_db_ratio:
+                return 'load-db', None
+            if roll < self.args.load_db_ratio + self.args.modify_ratio:
+                crop = self.rng.choice(CROP_NAMES)
+                return 'modify', f'modify: add crop {crop} to farm {self.rng.randint(1, self.args.farms)}'
+            if self.rng.random() < self.args.tail_ratio:
+                return 'search', f'crops on farm {self.rng.randint(1, self.args.farms)}'
+            questions = list(SEARCH_QUERIES)
+            weights = [1 / (i + 1) for i in range(len(questions))]
+            return 'search', self.rng.choices(questions, weights)[0]
+
+    def send(self, kind, question, scheduled):
+        error = None
+        try:
+            if kind == 'load-db':
+                response = self.load_db()
+            else:
+                response = self.session().post(f'{self.app_url}/api/query', json={
+                    'query': question,
+                    'aiProvider': 'stub',
+                    'includeQuery': True,
+                    'includeExplanation': self.args.explain,
+                    'includeResults': True,
+                }, timeout=self.args.timeout)
+            ok = response.status_code == 200
+            if not ok:
+                error = f'HTTP {response.status_code}: {response.text[:120].strip()}'
+        except Exception as e:
+            ok = False
+            error = f'{type(e).__name__}: {str(e)[:120]}'
+        return {'kind': kind, 'ok': ok, 'latency': time.perf_counter() - scheduled, 'error': error}
+
+    def run_closed_loop(self, concurrency):
+        deadline = time.perf_counter() + self.args.duration
+        results = []
+        results_lock = threading.Lock()
+
+        def worker():
+            while time.perf_counter() < deadline:
+                kind, question = self.pick_request()
+                result = self.send(kind, question, time.perf_counter())
+                with results_lock:
+                    results.append(result)
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def run_open_loop(self, rate):
+        # Latency is measured from the scheduled arrival time, so time spent
+        # queued behind a saturated server is not hidden (coordinated omission)
+        start = time.perf_counter()
+        arrival = start
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.args.max_inflight) as executor:
+            while True:
+                with self.rng_lock:
+                    arrival += self.rng.expovariate(rate)
+                if arrival - start > self.args.duration:
+                    break
+                delay = arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                kind, question = self.pick_request()
+                futures.append(executor.submit(self.send, kind, question, arrival))
+        return [future.result() for future in futures]
+
+    def run_step(self, label, runner, value):
+        self.pipe.reset()
+        started = time.perf_counter()
+        results = runner(value)
+        elapsed = time.perf_counter() - started
+        return summarize(label, results, elapsed, self.pipe)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies):
+    return {
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p90_ms': ms(percentile(latencies, 90)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(max(latencies) if latencies else None),
+    }
+
+
+def ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def summarize(label, results, elapsed, pipe):
+    ok = [r for r in results if r['ok']]
+    errors = collections.Counter(r['error'] for r in results if not r['ok'])
+    by_kind = {}
+    for kind in sorted({r['kind'] for r in results}):
+        latencies = [r['latency'] for r in ok if r['kind'] == kind]
+        by_kind[kind] = {'count': sum(1 for r in results if r['kind'] == kind), **latency_summary(latencies)}
+    pipe_stats = pipe.snapshot()
+    return {
+        'label': label,
+        'requests': len(results),
+        'throughput_rps': round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(1 - len(ok) / len(results), 4) if results else 0.0,
+        **latency_summary([r['latency'] for r in ok]),
+        'by_kind': by_kind,
+        'pipe': pipe_stats,
+        'top_errors': errors.most_common(3),
+    }
+
+
+def print_report(steps):
+    header = f"{'step':<10}{'reqs':>7}{'rps':>9}{'err%':>8}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'wait p99':>10}{'rtt p99':>9}{'stalls':>8}{'inflight':>9}"
+    print(header)
+    print('-' * len(header))
+    for step in steps:
+        print(f"{step['label']:<10}{step['requests']:>7}{step['throughput_rps']:>9}{step['error_rate'] * 100:>8.2f}"
+              f"{fmt(step['p50_ms'])}{fmt(step['p90_ms'])}{fmt(step['p99_ms'])}{fmt(step['max_ms'])}"
+              f"{fmt(step['pipe']['wait']['p99_ms'], 10)}{fmt(step['pipe']['round_trip']['p99_ms'])}"
+              f"{step['pipe']['stalls']:>8}{step['pipe']['max_in_flight']:>9}")
+        for error, count in step['top_errors']:
+            print(f'    {count}x {error}')
+
+
+def fmt(value, width=9):
+    return f"{'-' if value is None else value:>{width}}"
+
+
+def compare_baseline(steps, baseline, tolerance, error_rate_tolerance):
+    """Prints throughput/p99/error-rate deltas against a saved run; returns True on regression."""
+    previous = {step['label']: step for step in baseline['steps']}
+    regressed = False
+    print(f'\nComparison against baseline (tolerance {tolerance:.0%}, error rate +{error_rate_tolerance:.2%}):')
+    for step in steps:
+        base = previous.get(step['label'])
+        if not base:
+            print(f"  {step['label']}: no baseline step")
+            continue
+        notes = []
+        if base['throughput_rps'] and step['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            notes.append('throughput regressed')
+        if base['p99_ms'] and step['p99_ms'] and step['p99_ms'] > base['p99_ms'] * (1 + tolerance):
+            notes.append('p99 regressed')
+        if step['error_rate'] > base['error_rate'] + error_rate_tolerance:
+            notes.append('error rate regressed')
+        regressed = regressed or bool(notes)
+        print(f"  {step['label']}: rps {base['throughput_rps']} -> {step['throughput_rps']}, "
+              f"p99 {base['p99_ms']} -> {step['p99_ms']} ms, "
+              f"errors {base['error_rate']:.2%} -> {step['error_rate']:.2%}"
+              f"{'  [' + ', '.join(notes) + ']' if notes else ''}")
+    return regressed
+
+
+def parse_levels(value):
+    return [float(v) for v in value.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=parse_levels, help='closed-loop client counts, e.g. 1,2,4,8')
+    parser.add_argument('--rate', type=parse_levels, help='open-loop arrival rates in requests/s, e.g. 5,10,20')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per step')
+    parser.add_argument('--modify-ratio', type=float, default=0.0, help='share of modify-mode queries')
+    parser.add_argument('--load-db-ratio', type=float, default=0.0, help='share of /api/load-db re-uploads')
+    parser.add_argument('--tail-ratio', type=float, default=0.3, help='share of searches drawn from the long tail')
+    parser.add_argument('--explain', action='store_true', help='request explanations as well as results')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='stub AI provider delay per call in seconds')
+    parser.add_argument('--no-materialize', action='store_true', help='disable answer materialization in the MCP server')
+    parser.add_argument('--farms', type=int, default=200)
+    parser.add_argument('--crops-per-farm', type=int, default=50)
+    parser.add_argument('--max-inflight', type=int, default=256, help='open-loop client thread cap')
+    parser.add_argument('--timeout', type=float, default=60, help='per-request HTTP timeout in seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='write the full report to this file')
+    parser.add_argument('--baseline', help='compare against a report saved with --save-baseline')
+    parser.add_argument('--save-baseline', help='save this run as a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative throughput/p99 regression vs baseline')
+    parser.add_argument('--error-rate-tolerance', type=float, default=0.01,
+                        help='allowed absolute error-rate increase vs baseline, e.g. 0.01 = one percentage point')
+    parser.add_argument('--stall-ms', type=float, default=50, help='pipe wait above which a call counts as stalled')
+    parser.add_argument('--keep-workdir', action='store_true', help='keep the scratch directory with logs and databases')
+    parser.add_argument('--mcp-stub', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mcp_stub:
+        run_stub_mcp_server(args.llm_latency)
+        return
+
+    if args.concurrency and args.rate:
+        parser.error('use either --concurrency or --rate, not both')
+    # The harness changes into a scratch directory, so resolve paths first
+    for name in ('json', 'baseline', 'save_baseline'):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    harness = Harness(args)
+    if args.rate:
+        plan = [(f'r={rate:g}', harness.run_open_loop, rate) for rate in args.rate]
+    else:
+        plan = [(f'c={int(c)}', harness.run_closed_loop, int(c)) for c in (args.concurrency or [1])]
+
+    try:
+        harness.start()
+        steps = []
+        for label, runner, value in plan:
+            print(f'Running step {label} for {args.duration:g}s...', file=sys.stderr)
+            steps.append(harness.run_step(label, runner, value))
+    finally:
+        harness.stop()
+
+    report = {'config': {k: v for k, v in vars(args).items() if k not in ('json', 'baseline', 'save_baseline', 'mcp_stub')},
+              'steps': steps}
+    print_report(steps)
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if compare_baseline(steps, baseline, args.tolerance, args.error_rate_tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
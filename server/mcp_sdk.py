@@ -16,6 +16,8 @@ class StdioServerTransport:
             protocol = asyncio.StreamReaderProtocol(reader)
             await asyncio.get_event_loop().connect_read_pipe(lambda: protocol, sys.stdin)
             logger.info("Connected to stdin")
+            tasks = set()
+            running = {}
             while True:
                 logger.info("Waiting for input...")
                 line = await reader.readline()
@@ -25,33 +27,62 @@ class StdioServerTransport:
                 logger.info(f"Received line: {line}")  # Added this
                 message = json.loads(line.decode().strip())
                 logger.info(f"Received message: {message}")
-                if message['type'] == 'call_tool':
-                    tool_name = message['name']
-                    arguments = message['arguments']
-                    if tool_name in server.tools:
-                        tool = server.tools[tool_name]
-                        if 'func' in tool:
-                            result = await tool['func'](arguments)
-                            logger.info(f"Tool {tool_name} result: {result}")
-                            print(json.dumps(result))
-                            sys.stdout.flush()
-                        else:
-                            logger.warning(f"Tool function not found for: {tool_name}")
-                            print(json.dumps({'error': 'Tool function not found'}))
-                            sys.stdout.flush()
-                    else:
-                        logger.warning(f"Tool not found: {tool_name}")
-                        print(json.dumps({'error': 'Tool not found'}))
-                        sys.stdout.flush()
-                else:
-                    logger.warning(f"Unknown message type: {message['type']}")
-                    print(json.dumps({'error': 'Unknown message type'}))
-                    sys.stdout.flush()
+                if message.get('type') == 'cancel':
+                    # The client gave up on this call; stop it rather than let
+                    # it hold a database slot nobody is waiting for
+                    task = running.get(message.get('id'))
+                    if task:
+                        logger.info(f"Cancelling request {message['id']}")
+                        task.cancel()
+                    continue
+                # Messages are handled concurrently so one slow tool call does not
+                # hold up the rest; the echoed id lets the client match responses
+                task = asyncio.create_task(self.handle_message(server, message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                if 'id' in message:
+                    request_id = message['id']
+                    running[request_id] = task
+                    task.add_done_callback(lambda _, request_id=request_id: running.pop(request_id, None))
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
         except Exception as e:
             logger.error(f"Server error: {str(e)}")
             print(json.dumps({'error': f'Server error: {str(e)}'}))
             sys.stdout.flush()
 
+    async def handle_message(self, server, message):
+        """Dispatches a single message and writes its response."""
+        try:
+            if message['type'] == 'call_tool':
+                tool_name = message['name']
+                arguments = message['arguments']
+                if tool_name in server.tools:
+                    tool = server.tools[tool_name]
+                    if 'func' in tool:
+                        result = await tool['func'](arguments)
+                        logger.info(f"Tool {tool_name} result: {result}")
+                        self.respond(message, result)
+                    else:
+                        logger.warning(f"Tool function not found for: {tool_name}")
+                        self.respond(message, {'error': 'Tool function not found'})
+                else:
+                    logger.warning(f"Tool not found: {tool_name}")
+                    self.respond(message, {'error': 'Tool not found'})
+            else:
+                logger.warning(f"Unknown message type: {message['type']}")
+                self.respond(message, {'error': 'Unknown message type'})
+        except Exception as e:
+            logger.error(f"Server error: {str(e)}")
+            self.respond(message, {'error': f'Server error: {str(e)}'})
+
+    def respond(self, message, payload):
+        """Writes a response line, tagged with the request id when there is one."""
+        if 'id' in message:
+            payload = {**payload, 'id': message['id']}
+        print(json.dumps(payload))
+        sys.stdout.flush()
+
 class StdioClientTransport:
     """Handles communication with the MCP server via stdin/stdout."""
     def __init__(self, command, args):
@@ -97,24 +128,74 @@ class Client:
         self.name = name
         self.version = version
         self.transport = None
+        self.pending = {}
+        self.next_id = 0
+        self.reader = None
 
     async def connect(self, transport):
         """Connects the client to the specified transport."""
         logger.info(f"Client {self.name} (v{self.version}) connecting with transport")
         self.transport = transport
         await self.transport.connect()
+        self.reader = asyncio.create_task(self.read_responses())
+
+    async def read_responses(self):
+        """Routes each response from the server to the call waiting on its id."""
+        while True:
+            response = await self.transport.receive()
+            logger.info(f"Raw response from server: '{response}'")
+            if not response:
+                logger.error("Empty response from MCP server")
+                self.fail_pending(ValueError('Empty response from MCP server'))
+                break
+            try:
+                message = json.loads(response)
+            except json.JSONDecodeError as e:
+                logger.error(f"Invalid response from MCP server: {e}")
+                self.resolve(None, exception=e)
+                continue
+            self.resolve(message.pop('id', None), message)
+
+    def resolve(self, request_id, message=None, exception=None):
+        # Errors the server could not tie to a request go to the oldest caller
+        if request_id is None and self.pending:
+            request_id = next(iter(self.pending))
+        future = self.pending.pop(request_id, None)
+        if future is None or future.done():
+            logger.warning(f"Dropping response for unknown request id: {request_id}")
+        elif exception:
+            future.set_exception(exception)
+        else:
+            future.set_result(message)
+
+    def fail_pending(self, exception):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(exception)
+        self.pending.clear()
 
     async def call_tool(self, name, arguments):
         """Calls a tool on the MCP server and returns the response."""
         logger.info(f"Calling tool: {name} with arguments: {arguments}")
-        message = json.dumps({'type': 'call_tool', 'name': name, 'arguments': arguments})
-        await self.transport.send(message)
-        response = await self.transport.receive()
-        logger.info(f"Raw response from server: '{response}'")
-        if not response:
-            logger.error("Empty response from MCP server")
+        if self.reader is None or self.reader.done():
             raise ValueError('Empty response from MCP server')
-        return json.loads(response)
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        message = json.dumps({'type': 'call_tool', 'id': request_id, 'name': name, 'arguments': arguments})
+        try:
+            await self.transport.send(message)
+            return await future
+        except asyncio.CancelledError:
+            # Nobody will read the response; tell the server to stop the work
+            try:
+                await self.transport.send(json.dumps({'type': 'cancel', 'id': request_id}))
+            except Exception as e:
+                logger.error(f"Failed to cancel request {request_id}: {e}")
+            raise
+        finally:
+            self.pending.pop(request_id, None)
 
 class McpServer:
     """Basic MCP server implementation."""
@@ -10,6 +10,13 @@ import pyodbc
 from google import genai
 import requests
 import re
+import threading
+import pathlib
+import asyncio
+import hashlib
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 # Load environment variables
 load_dotenv()
@@ -22,9 +29,59 @@ logger = logging.getLogger()
 schema_info = None
 sql_cache: Dict[str, Union[str, dict]] = {}
 result_cache: Dict[str, List[Any]] = {}
+# Bumped on every invalidation; reads that started before one must not be cached
+data_generation = 0
 
 # Database instance
 db = None
+db_config = None
+db_signature = None
+db_data_version = None
+sqlite_version_conn = None
+schema_version = None
+
+# SQLite read path: search mode runs on per-thread read-only connections,
+# modify mode goes through the single writer connection held in `db`.
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -64 * 1024))  # negative value = KiB
+SQLITE_IMMUTABLE = os.getenv('SQLITE_IMMUTABLE', 'false').lower() == 'true'
+sqlite_generation = 0
+sqlite_reader_local = threading.local()
+sqlite_write_lock = threading.Lock()
+
+# Blocking database work runs off the event loop. MSSQL/MongoDB and SQLite
+# writes use the thread pool; SQLite searches can use a process pool instead.
+DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', 8))
+DB_QUERY_TIMEOUT = float(os.getenv('DB_QUERY_TIMEOUT', 30))
+SQLITE_EXECUTOR = os.getenv('SQLITE_EXECUTOR', 'thread').lower()
+DB_CONCURRENCY_LIMITS = {
+    'sqlite': int(os.getenv('SQLITE_MAX_CONCURRENCY', 4)),
+    'mssql': int(os.getenv('MSSQL_MAX_CONCURRENCY', 1)),
+    'mongodb': int(os.getenv('MONGODB_MAX_CONCURRENCY', 8)),
+}
+# pyodbc connections must not be shared between threads (threadsafety = 1)
+mssql_lock = threading.Lock()
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix='db')
+db_process_executor = None
+db_semaphores: Dict[str, asyncio.Semaphore] = {}
+db_metrics: Dict[str, Dict[str, int]] = {
+    db_type: {'queued': 0, 'running': 0, 'draining': 0, 'completed': 0, 'failed': 0, 'cancelled': 0}
+    for db_type in DB_CONCURRENCY_LIMITS
+}
+# Abandoned workers that cannot be interrupted, still holding their slot
+draining_workers = set()
+
+# Answer materialization: hot search questions are pre-run in the background
+# and served without calling the AI provider or the database.
+MATERIALIZE_TOP_N = int(os.getenv('MATERIALIZE_TOP_N', 20))
+MATERIALIZE_MIN_HITS = int(os.getenv('MATERIALIZE_MIN_HITS', 3))
+MATERIALIZE_INTERVAL = float(os.getenv('MATERIALIZE_INTERVAL', 300))
+MATERIALIZE_EXPLANATIONS = os.getenv('MATERIALIZE_EXPLANATIONS', 'false').lower() == 'true'
+MATERIALIZE_MAX_TRACKED = int(os.getenv('MATERIALIZE_MAX_TRACKED', 10000))
+question_counts: Counter = Counter()
+question_meta: Dict[str, Dict[str, Any]] = {}
+materialized_answers: Dict[str, Dict[str, Any]] = {}
+materialize_event = None
 
 def generate_query_prompt(params: dict) -> str:
     schema_info = params['schemaInfo']
@@ -180,19 +237,213 @@ class NovitaAIProvider(AIProvider):
         cleaned = re.sub(r'<think>[\s\S]*?</think>', '', raw).strip()
         return cleaned
 
+# SQLite connection handling
+def open_sqlite_reader(path: str) -> sqlite3.Connection:
+    mode = 'immutable=1' if SQLITE_IMMUTABLE else 'mode=ro'
+    uri = f"{pathlib.Path(path).resolve().as_uri()}?{mode}"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+    conn.execute(f'PRAGMA cache_size={SQLITE_CACHE_SIZE}')
+    conn.execute('PRAGMA query_only=ON')
+    return conn
+
+def get_sqlite_reader() -> sqlite3.Connection:
+    conn = getattr(sqlite_reader_local, 'conn', None)
+    if conn is None or sqlite_reader_local.generation != sqlite_generation:
+        if conn is not None:
+            # Stale readers are closed by the thread that owns them
+            conn.close()
+        conn = open_sqlite_reader(db_config['path'])
+        sqlite_reader_local.conn = conn
+        sqlite_reader_local.generation = sqlite_generation
+        logger.info(f'Opened SQLite read connection for thread {threading.current_thread().name}')
+    return conn
+
+def retire_sqlite_readers():
+    global sqlite_generation
+    sqlite_generation += 1
+
+def run_sqlite_query(query: str, mode: str, active: Dict[str, Any]) -> List[Any]:
+    if mode == 'search':
+        conn = get_sqlite_reader()
+        active['conn'] = conn
+        cursor = conn.execute(query)
+        columns = [desc[0] for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    if SQLITE_IMMUTABLE:
+        raise Exception('Modify Mode is disabled while SQLITE_IMMUTABLE is enabled')
+    with sqlite_write_lock:
+        conn = db
+        active['conn'] = conn
+        cursor = conn.execute(query)
+        conn.commit()
+    return [cursor.rowcount]
+
+# Process pool workers keep their own read connection, one per process
+sqlite_process_conn = None
+sqlite_process_key = None
+
+def run_sqlite_search_in_process(path: str, generation: int, query: str) -> List[Any]:
+    global sqlite_process_conn, sqlite_process_key
+    if sqlite_process_conn is None or sqlite_process_key != (path, generation):
+        if sqlite_process_conn:
+            sqlite_process_conn.close()
+        sqlite_process_conn = open_sqlite_reader(path)
+        sqlite_process_key = (path, generation)
+    cursor = sqlite_process_conn.execute(query)
+    columns = [desc[0] for desc in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def get_process_executor() -> ProcessPoolExecutor:
+    global db_process_executor
+    if db_process_executor is None:
+        db_process_executor = ProcessPoolExecutor(max_workers=DB_CONCURRENCY_LIMITS['sqlite'])
+    return db_process_executor
+
+def interrupt_query(active: Dict[str, Any]):
+    try:
+        if 'conn' in active:
+            active['conn'].interrupt()
+        elif 'cursor' in active:
+            active['cursor'].cancel()
+    except Exception as e:
+        logger.error(f'Failed to interrupt running query: {e}')
+
+async def stop_worker(future, active: Dict[str, Any]):
+    # Keep the concurrency slot until the worker has really stopped, otherwise
+    # abandoned queries would pile up beyond the per-backend limit
+    interrupt_query(active)
+    await asyncio.wait({future})
+    if not future.cancelled():
+        future.exception()
+
+async def drain_worker(future, semaphore: asyncio.Semaphore, metrics: Dict[str, int]):
+    try:
+        await asyncio.wait({future})
+        if not future.cancelled():
+            future.exception()
+    finally:
+        metrics['draining'] -= 1
+        metrics['running'] -= 1
+        semaphore.release()
+
+def abandon_worker(future, semaphore: asyncio.Semaphore, metrics: Dict[str, int]):
+    # Process-pool and MongoDB work cannot be interrupted from here, so the
+    # caller is answered now and the slot is released once the worker ends
+    metrics['draining'] += 1
+    task = asyncio.get_running_loop().create_task(drain_worker(future, semaphore, metrics))
+    draining_workers.add(task)
+    task.add_done_callback(draining_workers.discard)
+
+async def run_blocking(db_type: str, executor, func, *args, active: Dict[str, Any] = None):
+    semaphore = db_semaphores.setdefault(db_type, asyncio.Semaphore(DB_CONCURRENCY_LIMITS[db_type]))
+    metrics = db_metrics[db_type]
+    metrics['queued'] += 1
+    logger.info(f'DB executor {db_type}: {metrics}')
+    try:
+        await semaphore.acquire()
+    finally:
+        metrics['queued'] -= 1
+    metrics['running'] += 1
+    future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    abandoned = False
+    try:
+        done, _ = await asyncio.wait({future}, timeout=DB_QUERY_TIMEOUT)
+        if not done:
+            raise asyncio.TimeoutError
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        metrics['cancelled'] += 1
+        if active is None:
+            abandon_worker(future, semaphore, metrics)
+            abandoned = True
+        else:
+            await stop_worker(future, active)
+        if isinstance(e, asyncio.TimeoutError):
+            raise Exception(f'Query timed out after {DB_QUERY_TIMEOUT:g}s')
+        raise
+    finally:
+        if not abandoned:
+            metrics['running'] -= 1
+            semaphore.release()
+    try:
+        result = future.result()
+    except Exception:
+        metrics['failed'] += 1
+        raise
+    metrics['completed'] += 1
+    return result
+
+def run_mongo_query(query: dict) -> List[Any]:
+    collection = db[query['collection']]
+    if query['operation'] == 'find':
+        return list(collection.find(query['filter'], max_time_ms=int(DB_QUERY_TIMEOUT * 1000)))
+    elif query['operation'] == 'insertOne':
+        return [collection.insert_one(query['document']).inserted_id]
+    elif query['operation'] == 'updateOne':
+        return [collection.update_one(query['filter'], {'$set': query['update']}).modified_count]
+    elif query['operation'] == 'deleteOne':
+        return [collection.delete_one(query['filter']).deleted_count]
+    else:
+        raise Exception(f'Unsupported MongoDB operation: {query["operation"]}')
+
+def run_mssql_query(query: str, active: Dict[str, Any]) -> List[Any]:
+    with mssql_lock:
+        cursor = db.cursor()
+        active['cursor'] = cursor
+        cursor.execute(query)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def open_sqlite_version_conn(path: str) -> sqlite3.Connection:
+    # Read on the event loop, so no busy timeout: a locked file answers at once
+    uri = f"{pathlib.Path(path).resolve().as_uri()}?mode=ro"
+    return sqlite3.connect(uri, uri=True, timeout=0)
+
+def get_data_version() -> Union[int, None]:
+    # SQLite bumps data_version when another connection or process commits;
+    # other backends give no cheap change marker. A database locked by a
+    # writer is treated as changed.
+    if db_config['type'] != 'sqlite':
+        return None
+    try:
+        return sqlite_version_conn.execute('PRAGMA data_version').fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
 # Database connection handling
 async def reload_db():
-    global db
+    global db, db_config, db_signature, db_data_version, sqlite_version_conn, schema_version, schema_info
     try:
-        if db:
-            db.close()
-            logger.info('Existing database connection closed')
-            db = None
         with open('db-config.txt', 'r') as f:
-            config = json.load(f)
+            raw_config = f.read()
+        config = json.loads(raw_config)
+        signature = (os.stat('db-config.txt').st_mtime_ns, raw_config)
+        if db is not None and signature == db_signature:
+            logger.info('Database config unchanged - reusing existing connections')
+            data_version = get_data_version()
+            if data_version is None or data_version != db_data_version:
+                # Writes made outside this server are never seen otherwise
+                clear_result_cache()
+                if db_config['type'] == 'sqlite':
+                    # Other backends give no change marker, so their answers
+                    # are only as fresh as the MATERIALIZE_INTERVAL refresh
+                    invalidate_materialized()
+                db_data_version = data_version
+            return
+        if db is not None:
+            # Tool calls run concurrently, so queries on executor threads may
+            # still hold the old connection; it closes once they release it
+            db = None
+            logger.info('Existing database connection released')
+        retire_sqlite_readers()
         
         if config['type'] == 'sqlite':
-            db = sqlite3.connect(config['path'])
+            # mode=rw so a missing upload fails instead of creating an empty file
+            uri = f"{pathlib.Path(config['path']).resolve().as_uri()}?mode=rw"
+            db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            if sqlite_version_conn:
+                sqlite_version_conn.close()
+            sqlite_version_conn = open_sqlite_version_conn(config['path'])
         elif config['type'] == 'mongodb':
             client = pymongo.MongoClient(config['url'])
             db = client[config['dbName']]
@@ -201,59 +452,73 @@ async def reload_db():
                 f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={config['server']};"
                 f"DATABASE={config['database']};UID={config['user']};PWD={config['password']}"
             )
+        db_config = config
+        db_signature = signature
+        db_data_version = get_data_version()
         
         logger.info(f'Connected to {config["type"]} database')
         with open('schema.txt', 'r') as f:
             schema_info = f.read()
             logger.info(f'Schema reloaded: "{schema_info}"')
+        previous_version = schema_version
+        schema_version = hashlib.sha256((config['type'] + schema_info).encode()).hexdigest()[:16]
         
-        sql_cache.clear()
-        result_cache.clear()
+        if schema_version != previous_version:
+            # Generated queries are only valid for the schema they were written against
+            sql_cache.clear()
+            for meta in question_meta.values():
+                meta.pop('generatedQuery', None)
+        clear_result_cache()
         logger.info('SQL and result caches cleared')
+        invalidate_materialized()
     except Exception as e:
         logger.error(f'Failed to reload database or schema: {e}')
         raise Exception('Failed to reload database or schema')
 
+def clear_result_cache():
+    global data_generation
+    data_generation += 1
+    result_cache.clear()
+
 # Execute database query
 async def execute_query(query: Union[str, dict], mode: str, db_type: str) -> List[Any]:
     cache_key = json.dumps(query)
-    if cache_key in result_cache:
+    if mode == 'search' and cache_key in result_cache:
         return result_cache[cache_key]
+    generation = data_generation
     
     if not db:
         raise Exception('Database connection not initialized')
     
+    active: Dict[str, Any] = {}
     if db_type == 'mongodb':
         if not isinstance(query, dict):
             raise Exception('MongoDB query must be an object')
-        collection = db[query['collection']]
-        if query['operation'] == 'find':
-            rows = list(collection.find(query['filter']))
-        elif query['operation'] == 'insertOne':
-            rows = [collection.insert_one(query['document']).inserted_id]
-        elif query['operation'] == 'updateOne':
-            rows = [collection.update_one(query['filter'], {'$set': query['update']}).modified_count]
-        elif query['operation'] == 'deleteOne':
-            rows = [collection.delete_one(query['filter']).deleted_count]
-        else:
-            raise Exception(f'Unsupported MongoDB operation: {query["operation"]}')
+        rows = await run_blocking(db_type, db_executor, run_mongo_query, query)
     else:
         if not isinstance(query, str):
             raise Exception('SQL query must be a string')
         if mode == 'search' and not query.strip().upper().startswith('SELECT'):
             raise Exception('Only SELECT queries are allowed in Search Mode')
-        cursor = db.cursor()
-        cursor.execute(query)
         if db_type == 'sqlite':
-            columns = [desc[0] for desc in cursor.description]
-            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            if mode == 'search' and SQLITE_EXECUTOR == 'process':
+                rows = await run_blocking(db_type, get_process_executor(), run_sqlite_search_in_process, db_config['path'], sqlite_generation, query)
+            else:
+                rows = await run_blocking(db_type, db_executor, run_sqlite_query, query, mode, active, active=active)
         elif db_type == 'mssql':
-            columns = [column[0] for column in cursor.description]
-            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            rows = await run_blocking(db_type, db_executor, run_mssql_query, query, active, active=active)
         else:
             raise Exception('Unsupported SQL database type')
     
-    result_cache[cache_key] = rows
+    if mode == 'modify':
+        # Writes invalidate every cached read
+        clear_result_cache()
+        # Views, triggers, cascades and DDL make the touched tables hard to
+        # pin down, and modifications are rare, so drop every answer
+        invalidate_materialized()
+        return rows
+    if generation == data_generation:
+        result_cache[cache_key] = rows
     return rows
 
 
@@ -278,6 +543,120 @@ class GeminiAIProvider(AIProvider):
         response = await self.client.aio.models.generate_content(model=self.model, contents=prompt)
         return response.text
 
+def create_ai_provider(ai_provider_str: str) -> AIProvider:
+    if ai_provider_str == 'gemini':
+        return GeminiAIProvider(os.getenv('GEMINI_API_KEY'))
+    elif ai_provider_str.startswith('huggingface:'):
+        model = ai_provider_str.split(':')[1]
+        return HuggingFaceAIProvider(os.getenv('HUGGINGFACE_API_KEY'), model)
+    elif ai_provider_str.startswith('novita:'):
+        model = ai_provider_str.split(':')[1]
+        return NovitaAIProvider(os.getenv('HUGGINGFACE_API_KEY'), model)
+    else:
+        raise Exception(f'Unsupported AI provider: {ai_provider_str}')
+
+# Answer materialization
+def question_key(query_text: str, ai_provider_str: str, db_type: str) -> str:
+    normalized = ' '.join(query_text.lower().split())
+    return f'{db_type}:{ai_provider_str}:{normalized}'
+
+def record_question(key: str, meta: Dict[str, Any]):
+    question_counts[key] += 1
+    question_meta.setdefault(key, {}).update(meta)
+    if len(question_counts) > MATERIALIZE_MAX_TRACKED:
+        # Keep the hot head, forget the long tail (but never the question
+        # being recorded, which the caller is about to use)
+        keep = dict(question_counts.most_common(MATERIALIZE_MAX_TRACKED // 2))
+        keep[key] = question_counts[key]
+        question_counts.clear()
+        question_counts.update(keep)
+        for stale in set(question_meta) - set(keep):
+            question_meta.pop(stale, None)
+            materialized_answers.pop(stale, None)
+            sql_cache.pop(stale, None)
+
+def is_hot_question(key: str) -> bool:
+    if question_counts[key] < MATERIALIZE_MIN_HITS:
+        return False
+    return key in dict(question_counts.most_common(MATERIALIZE_TOP_N))
+
+def get_materialized(key: str, include_explanation: bool) -> Union[Dict[str, Any], None]:
+    entry = materialized_answers.get(key)
+    if not entry or entry['schemaVersion'] != schema_version:
+        return None
+    if include_explanation and entry['explanation'] is None:
+        return None
+    return entry
+
+def store_materialized(key: str, generated_query: Union[str, dict], results: List[Any], explanation: Union[str, None], generation: int):
+    if generation != data_generation or key not in question_meta:
+        # The data changed, or the question was pruned, while these results
+        # were being computed
+        return
+    materialized_answers[key] = {
+        'schemaVersion': schema_version,
+        'query': generated_query,
+        'results': results,
+        'explanation': explanation,
+        'refreshedAt': time.time(),
+    }
+
+def invalidate_materialized():
+    global data_generation
+    data_generation += 1
+    materialized_answers.clear()
+    logger.info('Materialized answers invalidated')
+    if materialize_event:
+        materialize_event.set()
+
+async def refresh_materialized():
+    for key, count in question_counts.most_common(MATERIALIZE_TOP_N):
+        if count < MATERIALIZE_MIN_HITS:
+            break
+        meta = question_meta.get(key)
+        if not meta or meta['dbType'] != db_config['type']:
+            continue
+        try:
+            ai_provider = None
+            generated_query = meta.get('generatedQuery')
+            if generated_query is None:
+                ai_provider = create_ai_provider(meta['aiProvider'])
+                generated_query = await ai_provider.generate_query(schema_info, 'search', meta['queryText'], meta['dbType'])
+                meta['generatedQuery'] = generated_query
+                if key in question_meta:
+                    sql_cache[key] = generated_query
+            result_cache.pop(json.dumps(generated_query), None)
+            generation = data_generation
+            results = await execute_query(generated_query, 'search', meta['dbType'])
+            explanation = None
+            if MATERIALIZE_EXPLANATIONS:
+                ai_provider = ai_provider or create_ai_provider(meta['aiProvider'])
+                explanation = await ai_provider.generate_explanation(meta['queryText'], results)
+            store_materialized(key, generated_query, results, explanation, generation)
+            logger.info(f'Materialized answer refreshed for "{meta["queryText"]}" ({count} hits)')
+        except Exception as e:
+            logger.error(f'Failed to materialize answer for "{meta["queryText"]}": {e}')
+
+async def run_materializer():
+    global materialize_event
+    materialize_event = asyncio.Event()
+    while True:
+        try:
+            await asyncio.wait_for(materialize_event.wait(), MATERIALIZE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        materialize_event.clear()
+        if not os.path.exists('db-config.txt'):
+            continue
+        try:
+            await ensure_schema_loaded()
+            await reload_db()
+            # The reload may itself invalidate; this run refreshes anyway
+            materialize_event.clear()
+            await refresh_materialized()
+        except Exception as e:
+            logger.error(f'Materializer run failed: {e}')
+
 # MCP Server Setup
 server = McpServer(name="Farming Database Server", version="1.0.0")
 
@@ -327,26 +706,37 @@ async def query_database(args: Dict[str, Any]) -> Dict[str, Any]:
     mode = 'modify' if user_query.lower().startswith('modify:') else 'search'
     query_text = re.sub(r'^(search|modify):', '', user_query, flags=re.IGNORECASE).strip()
     
+    # Serve hot search questions from materialized answers
+    key = question_key(query_text, ai_provider_str, db_type)
+    if mode == 'search':
+        record_question(key, {'queryText': query_text, 'aiProvider': ai_provider_str, 'dbType': db_type})
+        entry = get_materialized(key, include_explanation)
+        if entry:
+            logger.info(f'Serving materialized answer for "{query_text}"')
+            response = {}
+            if include_query:
+                response['query'] = entry['query']
+            if include_results:
+                response['results'] = entry['results']
+            if include_explanation:
+                response['explanation'] = entry['explanation']
+            return {"content": [{"type": "text", "text": json.dumps(response)}]}
+    
     # AI Provider Selection
     try:
-        if ai_provider_str == 'gemini':
-            ai_provider = GeminiAIProvider(os.getenv('GEMINI_API_KEY'))
-        elif ai_provider_str.startswith('huggingface:'):
-            model = ai_provider_str.split(':')[1]
-            ai_provider = HuggingFaceAIProvider(os.getenv('HUGGINGFACE_API_KEY'), model)
-        elif ai_provider_str.startswith('novita:'):
-            model = ai_provider_str.split(':')[1]
-            ai_provider = NovitaAIProvider(os.getenv('HUGGINGFACE_API_KEY'), model)
-        else:
-            raise Exception(f'Unsupported AI provider: {ai_provider_str}')
+        ai_provider = create_ai_provider(ai_provider_str)
         logger.info(f"AI provider initialized: {ai_provider_str}")
     except Exception as e:
         logger.error(f"Failed to initialize AI provider: {e}")
         return {"content": [{"type": "text", "text": json.dumps({"error": str(e)})}], "isError": True}
     
     try:
-        generated_query = await ai_provider.generate_query(schema_info, mode, query_text, db_type)
+        if mode == 'search' and key in sql_cache:
+            generated_query = sql_cache[key]
+        else:
+            generated_query = await ai_provider.generate_query(schema_info, mode, query_text, db_type)
         logger.info(f"Generated query: {generated_query}")
+        generation = data_generation
         result = await execute_query(generated_query, mode, db_type) if include_results else None
         logger.info(f"Query result: {result}")
         explanation = (
@@ -354,6 +744,15 @@ async def query_database(args: Dict[str, Any]) -> Dict[str, Any]:
             else "Explanation not available without query results." if include_explanation else None
         )
         
+        # Another request may have pruned this question while it ran; caching
+        # it then would put back an entry that is never pruned again
+        meta = question_meta.get(key) if mode == 'search' else None
+        if meta:
+            sql_cache[key] = generated_query
+            meta['generatedQuery'] = generated_query
+        if meta and include_results and is_hot_question(key):
+            store_materialized(key, generated_query, result, explanation if include_explanation else None, generation)
+        
         response = {}
         if include_query:
             response['query'] = generated_query
@@ -368,13 +767,22 @@ async def query_database(args: Dict[str, Any]) -> Dict[str, Any]:
         return {"content": [{"type": "text", "text": json.dumps(error_response)}], "isError": True}
 
 # Start the server
+@server.tool(name="db_metrics", schema={})
+async def get_db_metrics(args: Dict[str, Any]) -> Dict[str, Any]:
+    metrics = {
+        db_type: {**db_metrics[db_type], 'limit': limit}
+        for db_type, limit in DB_CONCURRENCY_LIMITS.items()
+    }
+    return {"content": [{"type": "text", "text": json.dumps(metrics)}]}
+
 async def main():
     logger.info("Starting MCP server")
     await load_schema()
+    materializer = asyncio.create_task(run_materializer())
     transport = StdioServerTransport()
     await transport.run_server(server)
     logger.info('MCP server running with StdioServerTransport')
+    materializer.cancel()
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
\ No newline at end of file